@@ -1,25 +1,57 @@
 import argparse
+import logging
 import sys
-from   time import sleep
 
 from .device.acr122u import ACR122u
 from .cards.mifare   import CardMifareClassic
 from .cards.factory  import CardFactory
 
+"""
+    Searches the default keys of a MIFARE Classic 1K tag connected to a reader
+        - Authenticating one block unlocks the whole sector (4 blocks on MIFARE Classic 1K)
+        - Keys are iterated in the outer loop, so each key is loaded into the reader only once
+          and then tested against every sector that is still locked
+        - The search only depends on the reader it is given: several readers (each one with its
+          own tag) can be searched concurrently, with one thread per reader
+    Returns a dict (sector, key_type) -> key
+"""
+def search_keys(reader, /, sectors:int = 16):
+    found = dict()
+    for key in CardMifareClassic.default_keys():
+        for ktype in range(2):
+            for sector in range(sectors):
+                if (sector, ktype) in found:
+                    continue
+
+                if reader.auth(key, block=sector*4, key_type=ktype)[-1] == 'Success':
+                    found[(sector, ktype)] = key
+                    print(f'Found key!!!! = (sector={sector},key_type={ktype})={key.hex()}')
+
+    return found
+
+
 """
     Definition of the main function body
 """
 def main():
     # Argument parsing
     parser = argparse.ArgumentParser('acr122u')
-    parser.add_argument('--getuid', action='store_true')
+    parser.add_argument('--getuid' , action='store_true')
+    parser.add_argument('--verbose', action='store_true', help='log reader and card events')
     arguments = parser.parse_args()
 
+    logging.basicConfig(level=logging.DEBUG if arguments.verbose else logging.INFO)
+
     # Added reader
     reader = ACR122u()
     CardFactory.create((0x00, 0x01))
-    sleep(60)
-    #print('firmware =', reader.firmware)
+
+    # Wait until a tag is presented and its card object has searched its own keys, instead of
+    # sleeping for a fixed time. Otherwise both searches would keep evicting each other's keys
+    if not reader.wait_card(timeout=60, ready=True):
+        print('No tag is connected')
+        return 1
+
     #print('firmware =', reader.firmware)
     #print('uid      =', reader.get_uid())
     #print('ats      =', reader.get_ats())
@@ -27,15 +59,10 @@ def main():
 
 
     # Search for keys
-    for block in range(64):
-        for ktype in range(2):
-            for key in CardMifareClassic.default_keys():
-                if reader.auth(key, block=block, key_type=ktype)[-1] == 'Success':
-                    print(f'Found key!!!! = (block={block},key_type={ktype})={key}')
-                    break
+    found = search_keys(reader)
 
-        if block == 0:
-            print(reader.block_read(block))
+    if (0, 0) in found and reader.auth(found[(0, 0)], block=0, key_type=0):
+        print(reader.block_read(0))
 
     return
 
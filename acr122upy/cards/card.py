@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 
 class ICard(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def is_unlocked(self):
         """
@@ -1,37 +1,75 @@
 """
     TODO: Factory Docstring
 """
+# ##############################################################################
+# System imports
+# ##############################################################################
+from collections import namedtuple
+
+
 # ##############################################################################
 # Project imports
 # ##############################################################################
 from .mifare import CardMifareClassic
 
 
+"""
+    Card type: name, maximum number of blocks (0xFFFFFFFF if not known) and implementing class (None if not supported)
+"""
+_CardType = namedtuple('card_type', ['name', 'block_max', 'card_class'])
+_UNKNOWN  = _CardType('unknown', 0xFFFFFFFF, None)
+
+"""
+    Card name bytes (from the card ATR), as a 16-bit integer (high << 8 | low) -> card type
+"""
+_PARSER:dict = \
+{
+    # key  card name            blocks      class
+    0x0001: _CardType('MIFARE Classic 1K', 0x40      , CardMifareClassic),
+    0x0002: _CardType('MIFARE Classic 4K', 0x100     , CardMifareClassic),
+    0x0003: _CardType('MIFARE Ultralight', 0x10      , CardMifareClassic),
+    0x0026: _CardType('MIFARE Mini'      , 0x14      , CardMifareClassic),
+    0xF004: _CardType('Topaz and Jewel'  , 0xFFFFFFFF, None             ),
+    0xF011: _CardType('FeliCa 212K'      , 0xFFFFFFFF, None             ),
+    0xF012: _CardType('FeliCa 424K'      , 0xFFFFFFFF, None             )
+}
+
+
 class CardFactory:
     """
         Creates card instances from 2 bytes of data comming from card readers
     """
-    __parser:dict = \
-    {
-        # key          card name
-        (0x00, 0x01): 'MIFARE Classic 1K',
-        (0x00, 0x02): 'MIFARE Classic 4K',
-        (0x00, 0x03): 'MIFARE Ultralight',
-        (0x00, 0x26): 'MIFARE Mini'      ,
-        (0xF0, 0x04): 'Topaz and Jewel'  ,
-        (0xF0, 0x11): 'FeliCa 212K'      ,
-        (0xF0, 0x11): 'FeliCa 424K'
-    }
-
     @staticmethod
-    def create(index:tuple, /, reader=None, path=None):
-        assert len(index) == 2                              , 'tuple must have two elements'
-        assert all(map(lambda x: isinstance(x, int), index)), 'all tuple element must be integer '
+    def card_type(index:int):
+        """
+            Gets the card type (name, block_max, card_class) from the 2 card name bytes of the ATR
+            The index is either an integer (high << 8 | low) or any sequence of two integers in [0, 256[
+            None (no card name bytes available) gives the unknown card type
+        """
+        if index is None:
+            return _UNKNOWN
+
+        if not isinstance(index, int):
+            index = bytes(index)
+            if len(index) != 2:
+                raise TypeError(f'index must have two bytes, got {index!r}')
 
-        # Get card label from tuple->card type parser
-        card_label = CardFactory.__parser.get(index, 'unknown')
+            index = (index[0] << 8) | index[1]
+
+        return _PARSER.get(index, _UNKNOWN)
+
+
+    @staticmethod
+    def create(index:int, /, reader=None, path=None, card_type=None):
+        """
+            Creates the card instance for the 2 card name bytes of the ATR (see card_type)
+            The card type can be given instead, if it was already looked up
+        """
+        # Get card type from index->card type parser
+        if card_type is None:
+            card_type = CardFactory.card_type(index)
 
-        if 'MIFARE' in card_label:
-            return CardMifareClassic(card_label, reader=reader, path=path)
+        if card_type.card_class is None:
+            raise Exception(f'Card type {card_type.name} is not supported')
 
-        raise Exception(f'Card type {card_label} is not supported')
+        return card_type.card_class(card_type.name, reader=reader, path=path)
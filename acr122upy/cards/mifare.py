@@ -72,15 +72,27 @@
                    specified by the command
 """
 
+# ##############################################################################
+# System imports
+# ##############################################################################
+import logging
+
+
 # ##############################################################################
 # Project imports
 # ##############################################################################
 from .card import ICard
 
+
+_log = logging.getLogger(__name__)
+
 """
     Default Authorization keys found in https://awesomeopensource.com/project/XaviTorello/mifare-classic-toolkit
+        - Includes the MAD (A0A1A2A3A4A5) and NDEF (D3F7D3F7D3F7) public keys
+        - Keys are converted to bytes and deduplicated (keeping their order) once at module load,
+          since each duplicated key costs a wasted authentication per sector and key type
 """
-_DEFAULT_KEYS = ([0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF], \
+_RAW_KEYS     = ([0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF], \
                  [0xA0, 0xB0, 0xC0, 0xD0, 0xE0, 0xF0], \
                  [0xA1, 0xB1, 0xC1, 0xD1, 0xE1, 0xF1], \
                  [0xA0, 0xA1, 0xA2, 0xA3, 0xA4, 0xA5], \
@@ -90,13 +102,14 @@ _DEFAULT_KEYS = ([0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF], \
                  [0x00, 0x00, 0x00, 0x00, 0x00, 0x00], \
                  [0xAA, 0xBB, 0xCC, 0xDD, 0xEE, 0xFF], \
                  [0xD3, 0xF7, 0xD3, 0xF7, 0xD3, 0xF7], \
-                 [0xAA, 0xBB, 0xCC, 0xDD, 0xEE, 0xFF], \
                  [0x71, 0x4C, 0x5C, 0x88, 0x6E, 0x97], \
                  [0x58, 0x7E, 0xE5, 0xF9, 0x35, 0x0F], \
                  [0xA0, 0x47, 0x8C, 0xC3, 0x90, 0x91], \
                  [0x53, 0x3C, 0xB6, 0xC7, 0x23, 0xF6], \
                  [0x8F, 0xD0, 0xA4, 0xF2, 0x56, 0xE9]  )
 
+_DEFAULT_KEYS = tuple(dict.fromkeys(bytes(k) for k in _RAW_KEYS))
+
 
 
 
@@ -104,14 +117,18 @@ class CardMifareClassic(ICard):
     # ##########################################################################
     # Attributes
     # ##########################################################################
-    __blocks:int = 0
-    __keys:dict  = dict()
-    __auth:int   = None
+    __slots__ = ('__blocks', '__keys', '__unlocked_mask', '__auth', \
+                 '__uid'   , '__label', '__bcc', '__man')
 
-    __uid:tuple  = None
-    __labe:str   = None
-    __bcc:int    = None
-    __man:tuple  = None
+    __blocks:int
+    __keys:list
+    __unlocked_mask:int
+    __auth:int
+
+    __uid:tuple
+    __label:str
+    __bcc:int
+    __man:tuple
 
     def __init__(self, card_type, /, reader=None, path=None):
         """
@@ -123,6 +140,10 @@ class CardMifareClassic(ICard):
                 - Depends if there's an actual reader available
         """
         self.__label = card_type
+        self.__auth  = None
+        self.__bcc   = None
+        self.__man   = None
+
         if (card_type == 'MIFARE Classic 1K'):
             self.__blocks = 0x40  # 1KBytes
         elif (card_type == 'MIFARE Classic 4K'):
@@ -130,9 +151,9 @@ class CardMifareClassic(ICard):
         else:
             raise NotImplementedError
 
-        # Create keys for the first time (per block and type (A/B))
-        self.__keys = { (b,t):None for b in range(self.__blocks) \
-                                   for t in range(2)             }
+        # Create keys for the first time (per block and type (A/B)), indexed by 2*block + type
+        self.__keys          = [None] * (2 * self.__blocks)
+        self.__unlocked_mask = 0
 
         # If reader is availailable, let's get all authentication keys
         self.__uid = reader.get_uid() if reader else None
@@ -152,8 +173,9 @@ class CardMifareClassic(ICard):
         """
             Card is unlocked if the number of blocks is unitialized and we know the
             authentication keys for each block
+            Each known key sets one bit of the unlocked mask, so this is a single integer compare
         """
-        return self.__blocks != 0 and all((v is not None for v in self.__keys.values()))
+        return self.__blocks != 0 and self.__unlocked_mask == (1 << len(self.__keys)) - 1
 
 
     def unlock(self, /, reader=None, path=None):
@@ -169,8 +191,8 @@ class CardMifareClassic(ICard):
                 for ktype in range(2):
                     for key in CardMifareClassic.default_keys():
                         if reader.auth(key, block=block, key_type=ktype):
-                            self.__keys[(block,ktype)] = key
-                            print(f'Unlocked key in {self}: block={block},type={ktype},key={key}')
+                            self._set_key(block, ktype, key)
+                            _log.debug('Unlocked key in %s: block=%d,type=%d,key=%s', self, block, ktype, key.hex())
                             break
 
 
@@ -181,6 +203,16 @@ class CardMifareClassic(ICard):
         raise NotImplementedError
 
 
+    def _set_key(self, block:int, key_type:int, key:bytes):
+        """
+            Stores the authentication key of a block and key type (A/B)
+            All key assignments must go through here, to keep the unlocked mask up to date
+        """
+        index = 2*block + key_type
+        self.__keys[index]    = key
+        self.__unlocked_mask |= 1 << index
+
+
 
     def block_write(self, block:int, data:list[int]):
         """
@@ -210,4 +242,7 @@ class CardMifareClassic(ICard):
     # ##########################################################################
     @staticmethod
     def default_keys():
-        yield from _DEFAULT_KEYS
+        """
+            Default authentication keys, as a tuple of 6-byte bytes objects
+        """
+        return _DEFAULT_KEYS
@@ -1,9 +1,17 @@
 # ##############################################################################
 # System imports
 # ##############################################################################
-from collections.abc import Iterable
-from collections     import namedtuple
-from time            import time, sleep
+from collections.abc    import Iterable
+from collections        import namedtuple
+from contextlib         import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from itertools          import groupby
+from time               import monotonic
+import asyncio
+import logging
+import queue
+import re
+import threading
 import weakref
 
 
@@ -11,9 +19,14 @@ import weakref
 # Imports from pyscard
 # ##############################################################################
 from smartcard.System           import readers
-from smartcard.ReaderMonitoring import ReaderObserver, ReaderMonitor
 from smartcard.CardMonitoring   import CardMonitor   , CardObserver
+from smartcard.scard            import SCardEstablishContext, SCardReleaseContext , SCardCancel        , \
+                                       SCardGetStatusChange , SCardGetErrorMessage, SCARD_SCOPE_USER   , \
+                                       SCARD_S_SUCCESS      , SCARD_E_CANCELLED   , SCARD_STATE_UNAWARE, \
+                                       SCARD_STATE_UNKNOWN  , INFINITE            , SCardTransmit
+from smartcard.pcsc.PCSCCardConnection import translateprotocolheader
 from smartcard.util             import toHexString
+from smartcard.Exceptions       import CardConnectionException, SmartcardException
 from smartcard.ATR              import ATR
 
 
@@ -23,29 +36,131 @@ from smartcard.ATR              import ATR
 from ..cards.factory import CardFactory
 
 
+_log = logging.getLogger(__name__)
+
+"""
+    Parsed response of a command. It evaluates to True if the command succeeded
+    Built once at module load, since namedtuple synthesizes a new class on every call
+"""
+class _CmdResponse(namedtuple('cmd_response', ['data', 'sw1', 'sw2', 'message'])):
+    __slots__ = ()
+
+    def __bool__(self):
+        return self.message == 'Success'
+
+"""
+    Status words (sw1, sw2) -> response message
+        - The first three are the ones documented for the ACR122U pseudo-APDUs
+        - The remaining are the ISO 7816-4 status words used by PC/SC part 3 storage card commands
+"""
+_SW_MESSAGES = { (0x90, 0x00): 'Success'                 ,
+                 (0x63, 0x00): 'Failed'                  ,
+                 (0x6A, 0x81): 'Not Supported'           ,
+                 (0x62, 0x82): 'End of File'             ,
+                 (0x67, 0x00): 'Wrong Length'            ,
+                 (0x69, 0x81): 'Incompatible Command'    ,
+                 (0x69, 0x82): 'Security Not Satisfied'  ,
+                 (0x69, 0x86): 'Command Not Allowed'     ,
+                 (0x6A, 0x82): 'Address Not Found'       ,
+                 (0x6B, 0x00): 'Wrong Parameters'        }
+
+"""
+    Hexadecimal string of every byte value, so that status words are looked up instead of formatted
+"""
+_HEX_BYTES = tuple(f'{b:02X}' for b in range(0x100))
+
+"""
+    Static commands (APDUs)
+    pyscard expects a list of integers, so they are kept as lists and must not be mutated
+"""
+_CMD_GET_UID       = [0xFF, 0xCA, 0x00, 0x00, 0x00]
+_CMD_GET_ATS       = [0xFF, 0xCA, 0x01, 0x00, 0x00]
+_CMD_FIRMWARE      = [0xFF, 0x00, 0x48, 0x00, 0x00]
+
+"""
+    Constant (immutable) prefixes of parameterized commands (APDUs), unpacked into a single list per command
+"""
+_CMD_LOAD_AUTH_KEY = (0xFF, 0x82, 0x00)                         # + [key_number, 0x06] + key
+_CMD_AUTHENTICATE  = (0xFF, 0x86, 0x00, 0x00, 0x05, 0x01, 0x00) # + [block, key_type, key_number]
+_CMD_BLOCK_READ    = (0xFF, 0xB0, 0x00)                         # + [block, length]
+
+"""
+    PC/SC pseudo-reader whose state changes when readers are added or removed (PnP notifications)
+"""
+_PNP_NOTIFICATION = r'\\?PnP?\Notification'
+
+"""
+    ATR bytes -> (card name index, card type, ATR checksum is valid)
+    A deployment usually sees a couple of card types, so each ATR is only parsed once
+"""
+_ATR_CACHE = dict()
+
+
 class ACR122u:
     """
         Class that wraps the ACR122U device and associated functionality
     """
-    __monitor:dict = None
-    __filter:str   = None
-    __reader       = None
-    __card         = None
-    __connection   = None
-    __firmware:str = None
+    __slots__ = ('__context'       , '__card_monitor', '__stopped'   ,
+                 '__filter'        , '__reader'      , '__card'      , '__connection',
+                 '__card_type'     , '__socket'      , '__handle'    , '__card_event',
+                 '__lock'          , '__firmware'    , '__uid'       , '__ats'       ,
+                 '__auth_keys'     , '__events'      , '__block_max' , '__sector_max',
+                 '__executor'      , '__ready_event' , '__weakref__' )
 
     def __init__(self, device='ACR122U', period=1):
         """
             Initializes device reference to the first device listed as ACR122U
             If no device is found, None is assigned to id
+                - device is a reader name filter (substring), or an iterable of filters (any may match)
+                - period (seconds) is only used to poll readers, if PnP notifications are not supported
         """
-        self.__filter  = device
-        self.__monitor = { 'reader' : ReaderMonitor(period=period),
-                           'card'   : CardMonitor()               ,
-                           'period' : period                      ,
-                           'last'   : time()                      }
-        self.__monitor['reader'].addObserver(ACR122u.__ReaderObserver(self))
-        self.__monitor['card'  ].addObserver(ACR122u.__CardObserver(  self))
+        # Reader name filters are compiled once into a single pattern
+        if not device:
+            self.__filter = None
+        elif isinstance(device, str):
+            self.__filter = re.compile(re.escape(device))
+        else:
+            self.__filter = re.compile('|'.join(map(re.escape, device)))
+
+        self.__reader         = None
+        self.__card           = None
+        self.__connection     = None
+        self.__card_type      = None
+        self.__block_max      = 0xFFFFFFFF
+        self.__sector_max     = 0xFFFFFFFF
+        self.__socket         = None
+        self.__handle         = None
+        self.__firmware       = None
+        self.__uid            = None
+        self.__ats            = None
+        self.__auth_keys      = [None, None]
+        self.__executor       = ThreadPoolExecutor(max_workers=1, thread_name_prefix='acr122u')
+        self.__card_event     = threading.Event()
+        self.__ready_event    = threading.Event()
+        self.__lock           = threading.RLock()
+        self.__events         = queue.SimpleQueue()
+        self.__stopped        = threading.Event()
+        self.__card_monitor   = CardMonitor()
+
+        # The context is shared with the monitoring thread, which replaces it if the PC/SC service fails
+        hresult, context = SCardEstablishContext(SCARD_SCOPE_USER)
+        if hresult != SCARD_S_SUCCESS:
+            raise Exception(f'Failed to establish PC/SC context: {SCardGetErrorMessage(hresult)}')
+        self.__context = [context]
+
+        # Readers are monitored by a thread blocked on PnP notifications, which is stopped
+        # (cancelling the blocking call) once this instance is gone
+        threading.Thread(target=ACR122u.__monitor_readers, args=(self.__events, self.__context, self.__stopped, period),
+                         daemon=True).start()
+        weakref.finalize(self, ACR122u.__stop_readers, self.__context, self.__stopped)
+
+        # Asynchronous commands run in a single worker (its thread only starts on the first command)
+        # A single worker is enough: commands to the tag are serialized by the lock anyway
+        weakref.finalize(self, self.__executor.shutdown, wait=False)
+
+        # Observers only queue events, which are handled by a dedicated thread
+        threading.Thread(target=ACR122u.__dispatch, args=(self.__events, weakref.ref(self)), daemon=True).start()
+        self.__card_monitor.addObserver(  ACR122u.__CardObserver(  self.__events))
 
 
     def update(self, /, rnew:Iterable = tuple(), rold:Iterable = tuple()):
@@ -54,16 +169,25 @@ class ACR122u:
             Remove readers from rold
                 - As long as they match the __filter attribute
         """
-        self._refreshed()
 
         for reader in rnew:
-            if not self.__filter or self.__filter in reader.name:
-                self.__reader = reader
-                print(f'Added   reader {self.__reader}')
+            if not self.__filter or self.__filter.search(reader.name):
+                with self.__lock:
+                    self.__reader    = reader
+                    self.__auth_keys = [None, None]
+                _log.debug('Added   reader %s', self.__reader)
         for reader in rold:
-            if not self.__filter or self.__filter in reader.name:
-                print(f'Removed reader {self.__reader}')
-                self.__reader = None
+            if not self.__filter or self.__filter.search(reader.name):
+                with self.__lock:
+                    if self.__reader is None or reader.name != self.__reader.name:
+                        continue
+
+                    # Reader events are not ordered with card events, which are then ignored without reader
+                    _log.debug('Removed reader %s', self.__reader)
+                    if self.__connection is not None:
+                        self.__clear_card()
+                    self.__reader    = None
+                    self.__auth_keys = [None, None]
 
 
     def update_card(self, cnew:Iterable = tuple(), cold:Iterable = tuple()):
@@ -72,120 +196,419 @@ class ACR122u:
             This is managed internall by the device. In this case, we are
             guaranteed that only one device is added or removed
         """
-        self._refreshed()
 
         if self.__reader:
             # Add cards from the some reader
-            list_cards = list(filter(lambda x: self.__reader.name == x.reader, cnew))
-            assert len(list_cards) <= 1
-
-            for card in list_cards:
-                self.__connection = card
-                self.__card       = CardFactory.create(tuple(card.atr[-7:-5]), reader=self)
-                print(f'Added   card {self.__card}')
+            reader_name = self.__reader.name
+            card        = next((c for c in cnew if c.reader == reader_name), None)
+
+            if card is not None:
+                index, card_type, checksum = ACR122u.__identify(card.atr)
+                if checksum is False:
+                    _log.warning('Invalid ATR checksum for card %s', toHexString(card.atr))
+
+                # Connect once per inserted card. The connection is reused by every command
+                # If it fails (e.g. the tag is still being placed), execute() connects on first use
+                #   - pyscard raises NoCardException (a SmartcardException, not a CardConnectionException)
+                #     if the tag was removed or is not in the field yet
+                socket = card.createConnection()
+                try:
+                    if socket is not None:
+                        socket.connect()
+                except SmartcardException:
+                    socket = None
+                if socket is None:
+                    _log.warning('Failed to connect to card, retrying on first command')
+
+                with self.__lock:
+                    self.__connection = card
+                    self.__card_type  = card_type
+                    self.__block_max  = self.__card_type.block_max
+                    self.__sector_max = 0xFFFFFFFF if self.__block_max == 0xFFFFFFFF else ACR122u._sector(self.__block_max - 1) + 1
+                    self.__socket     = socket
+                    self.__handle     = ACR122u.__handle_of(socket)
+                    self.__uid        = None
+                    self.__ats        = None
+                    self.__card_event.set()
+
+                # The card object unlocks the tag (thousands of commands), so it is built outside the lock
+                # Each command takes the lock on its own, so other threads can interleave their commands
+                # It is still built on the dispatcher thread: every queued event (including the removal of
+                # this tag) waits until it is done. Once the tag is gone, its commands fail and it ends early
+                # The tag is ready once this is done, even if it fails (e.g. unsupported card type)
+                card_object = None
+                try:
+                    card_object = CardFactory.create(index, reader=self, card_type=card_type)
+                finally:
+                    with self.__lock:
+                        if self.__connection is card:
+                            self.__card = card_object
+                            self.__ready_event.set()
+                _log.debug('Added   card %s', card_object)
 
             # Remove cards if the card is inserted
-            list_cards = list(filter(lambda x: x == self.__connection, cold))
-            assert len(list_cards) <= 1
+            with self.__lock:
+                if self.__connection is not None and self.__connection in cold:
+                    self.__clear_card()
+
+
+    def __clear_card(self):
+        """
+            Disconnects and forgets the current tag (the lock must be held)
+        """
+        _log.debug('Removed card %s', self.__card)
+        self.__card_event.clear()
+        self.__ready_event.clear()
+        self.__disconnect()
+
+        self.__card       = None
+        self.__connection = None
+        self.__card_type  = None
+        self.__block_max  = 0xFFFFFFFF
+        self.__sector_max = 0xFFFFFFFF
+        self.__uid        = None
+        self.__ats        = None
+
+
+    @staticmethod
+    def __identify(atr):
+        """
+            Gets the card name index, card type and ATR checksum validity of an ATR (cached per ATR)
+            The checksum validity is None if unknown: the ATR has no TCK byte, or it could not be parsed
+        """
+        key    = bytes(atr)
+        result = _ATR_CACHE.get(key)
+
+        if result is None:
+            # Card name bytes of the ATR, as a 16-bit integer (None if the ATR is too short)
+            index = (atr[-7] << 8) | atr[-6] if len(atr) >= 7 else None
+
+            # pyscard raises on malformed ATRs (e.g. invalid TS byte or truncated), which are still accepted
+            try:
+                checksum = ATR(atr).checksumOK
+            except (SmartcardException, IndexError):
+                checksum = None
 
-            if len(list_cards) == 1:
-                print(f'Removed card {self.__card}')
-                self.__card       = None
-                self.__connection = None
+            result = _ATR_CACHE[key] = (index, CardFactory.card_type(index), checksum)
 
+        return result
+
+
+    @staticmethod
+    def __dispatch(events, monitor):
+        """
+            Handles the events queued by the observers, so that pyscard monitoring threads never block
+            Only a weak reference to the instance is kept: the thread ends once the instance is gone
+        """
+        while True:
+            kind, added, removed = events.get()
+
+            instance = monitor()
+            if instance is None:
+                return
+
+            try:
+                if kind == 'reader':
+                    instance.update(rnew=added, rold=removed)
+                else:
+                    instance.update_card(cnew=added, cold=removed)
+            except Exception:
+                _log.exception('Failed to handle %s event', kind)
+            finally:
+                del instance
 
-    def _refreshed(self):
+
+    @staticmethod
+    def __monitor_readers(events, context, stopped, period):
         """
-            This tells the instance that the monitor was updated,
-            no timeouts can occur between the update and update+period
+            Queues reader events (as the observers do), in a thread of its own
+                - Blocks on the PC/SC PnP notifications in between, which only return when readers change
+                - If PnP notifications are not supported, readers are polled every period (seconds)
+                - If the PC/SC service fails (e.g. not running or restarted), the context is re-established
+                  and retried every period (seconds)
+            The context is a single item list, so that it can still be cancelled once replaced
         """
-        self.__monitor['last'] = time()
+        known  = list()
+        states = [(_PNP_NOTIFICATION, SCARD_STATE_UNAWARE)]
+        try:
+            while not stopped.is_set():
+                try:
+                    current = readers()
+                except Exception:
+                    _log.exception('Failed to list readers')
+                    current = known
+
+                added   = [r for r in current if r not in known]
+                removed = [r for r in known   if r not in current]
+                if added or removed:
+                    events.put(('reader', added, removed))
+                known = current
+
+                hresult, result = SCardGetStatusChange(context[0], INFINITE, states)
+                if hresult == SCARD_E_CANCELLED:
+                    return
+
+                if hresult != SCARD_S_SUCCESS:
+                    _log.warning('Failed to monitor readers: %s', SCardGetErrorMessage(hresult))
+                    SCardReleaseContext(context[0])
+
+                    # If it fails, the released context keeps failing, so it is retried on the next period
+                    hresult, replaced = SCardEstablishContext(SCARD_SCOPE_USER)
+                    if hresult == SCARD_S_SUCCESS:
+                        context[0] = replaced
+                    states = [(_PNP_NOTIFICATION, SCARD_STATE_UNAWARE)]
+                    stopped.wait(period)
+                elif result[0][1] & SCARD_STATE_UNKNOWN:
+                    stopped.wait(period)
+                else:
+                    states = [(name, state) for name, state, _ in result]
+        finally:
+            SCardReleaseContext(context[0])
 
 
-    def _stall(self):
+    @staticmethod
+    def __stop_readers(context, stopped):
         """
-            the instance sleeps until last+period
+            Stops the reader monitoring thread
         """
-        t = self.__monitor['last'] + self.__monitor['period'] - time()
-        if t > 0:
-            sleep(t)
+        stopped.set()
+        SCardCancel(context[0])
 
 
     @property
     def reader(self):
         return self.__reader
 
+
+    def wait_card(self, /, timeout=None, ready=False):
+        """
+            Blocks until a tag is connected or the timeout (seconds) is reached
+            If ready, it also waits until the card object of the tag is built (e.g. a MIFARE Classic
+            tag is unlocked with the default keys), so that its commands are no longer interleaved
+            Returns True if a tag is connected (and ready)
+        """
+        return (self.__ready_event if ready else self.__card_event).wait(timeout)
+
+
     def execute(self, command, /, timeout = 20):
-        self._stall()
+        """
+            Transmits a command to the connected tag
+                - Blocks (without spinning) until a tag is connected or the timeout (seconds) is reached
+                - The connection to the tag is opened on insertion and reused until the tag is removed
+                  (if it could not be opened on insertion, it is opened here)
+        """
+        return self.execute_many((command,), timeout=timeout)[0]
 
-        t_start = time()
 
-        while (time() - t_start) < timeout:
-            if self.__connection:
-                socket = self.__connection.createConnection()
-                socket.connect()
+    def execute_many(self, commands:Iterable, /, timeout = 20):
+        """
+            Transmits several commands to the connected tag, in order (see execute)
+                - Stalls and waits for the tag only once for all commands
+                - Holds the lock across all commands, so no other thread can interleave its own commands
+                  (e.g. between an authentication and the reads it unlocks)
+            Returns the list of responses
+        """
+        with self.__session(timeout):
+            return [self.__transmit(command) for command in commands]
+
+
+    @contextmanager
+    def __session(self, timeout = 20):
+        """
+            Waits for the tag (without holding the lock), then holds the lock while the tag is used
+                - No other thread can interleave its own commands within the session
+                - The tag can not be removed or replaced within the session (it is handled under the lock)
+            Sessions may be nested by the same thread (e.g. execute within auth)
+        """
+        t_end = monotonic() + timeout
+
+        # The event is set and cleared together with the tag (under the lock), therefore
+        # if the tag is removed meanwhile, we just wait again for the remaining time
+        while self.wait_card(max(t_end - monotonic(), 0)):
+            # Observer callbacks run on a background thread: the tag may be removed at any time
+            with self.__lock:
+                if self.__connection:
+                    if not self.__socket:
+                        self.__reconnect()
+
+                    yield
+                    return
 
-                # Transmit command
-                try:
-                    return socket.transmit(command)
-                finally:
-                    del socket
         # If the timeout was reached, let's raise exceptions:
-        else:
-            if not self.__reader:
-                raise Exception('No reader is connected with USB')
-            if not self.__connection:
-                raise Exception('No tag is connected')
-            else:
-                raise Exception('Fatal error')
+        if not self.__reader:
+            raise Exception('No reader is connected with USB')
+        raise Exception('No tag is connected')
+
+
+    def __transmit(self, command):
+        """
+            Transmits a command on the current connection (the lock must be held)
+        """
+        try:
+            return self.__transmit_once(command)
+        except CardConnectionException:
+            # The connection was lost while the tag is still present: reconnect (only once)
+            self.__reconnect()
+            return self.__transmit_once(command)
+
+
+    def __transmit_once(self, command):
+        """
+            Transmits a command straight through SCardTransmit on the PC/SC card handle
+            This skips the observer notifications and argument checks of CardConnection.transmit
+            If the handle is not available (non PC/SC connection), the pyscard connection is used
+        """
+        if self.__handle is None:
+            return self.__socket.transmit(command)
+
+        hresult, response = SCardTransmit(*self.__handle, command)
+        if hresult != SCARD_S_SUCCESS:
+            raise CardConnectionException(f'Failed to transmit with protocol: {SCardGetErrorMessage(hresult)}')
+        if len(response) < 2:
+            raise CardConnectionException('Card returned no valid response')
+
+        return response[:-2], response[-2], response[-1]
 
 
     @staticmethod
-    def parse_response(response):
-        cmd_response          = namedtuple('cmd_response', ['data', 'sw1', 'sw2', 'message'] )
-        cmd_response.__bool__ = lambda x : x.message == 'Success'
+    def __handle_of(socket):
+        """
+            Gets the (card handle, protocol header) of a connected pyscard connection, or None
+            pyscard wraps the PC/SC connection into a decorator, which holds it as component
+        """
+        if socket is None:
+            return None
+
+        connection = getattr(socket, 'component', socket)
+        hcard      = getattr(connection, 'hcard', None)
+        header     = translateprotocolheader(socket.getProtocol()) if hcard is not None else 0
+
+        return (hcard, header) if header else None
+
+
+    def __disconnect(self):
+        """
+            Closes the connection to the current tag, if any
+            The tag may already be gone, so failing to disconnect is not an error
+        """
+        if self.__socket:
+            try:
+                self.__socket.disconnect()
+            except CardConnectionException:
+                pass
+
+        self.__socket = None
+        self.__handle = None
+
+
+    def __reconnect(self):
+        """
+            Replaces the connection to the current tag by a new one
+        """
+        self.__disconnect()
+
+        socket = self.__connection.createConnection()
+        if socket is None:
+            raise CardConnectionException('Failed to create a connection to the card')
+
+        socket.connect()
+        self.__socket = socket
+        self.__handle = ACR122u.__handle_of(socket)
+
+
+    @staticmethod
+    def parse_response(response, /, *, raw=False):
+        """
+            Parses the (data, sw1, sw2) response of a command
+            If raw, data is kept as bytes and sw1/sw2 as integers (no hexadecimal formatting)
+        """
+        data, sw1, sw2 = response
 
-        data, sw1, sw2  = response
-        if (sw1, sw2) == (0x90, 0x00):
+        # Nearly every response is a success, which skips the status word lookup
+        if sw1 == 0x90 and sw2 == 0x00:
             message = 'Success'
-        elif (sw1, sw2) == (0x63, 0x00):
-            message = 'Failed'
-        elif (sw1, sw2) == (0x6A, 0x81):
-            message = 'Not Supported'
         else:
-            message = 'Unknown'
+            message = _SW_MESSAGES.get((sw1, sw2), 'Unknown')
+
+        if raw:
+            return _CmdResponse(bytes(data), sw1, sw2, message)
 
-        return cmd_response(toHexString(data), toHexString([sw1]), toHexString([sw2]), message)
+        # Same format as smartcard.util.toHexString (e.g. '3B 8F 80'), but formatted in C
+        return _CmdResponse(bytes(data).hex(' ').upper() if data else '', _HEX_BYTES[sw1], _HEX_BYTES[sw2], message)
 
 
     # ##########################################################################
     # Commands: Infos
     # ##########################################################################
     def get_uid(self):
-        result = ACR122u.parse_response(self.execute([0xFF, 0xCA, 0x00, 0x00, 0x00]))
-        return result.data if result else None
+        """
+            Gets the UID of the connected tag
+            It is constant while the tag remains connected, so it is only retrieved once per tag
+        """
+        # Within the session, the tag can not be replaced between the command and the cache
+        with self.__session():
+            if self.__uid is None:
+                result     = ACR122u.parse_response(self.execute(_CMD_GET_UID))
+                self.__uid = result.data if result else None
+
+            return self.__uid
 
 
     def get_ats(self):
-        result = ACR122u.parse_response(self.execute([0xFF, 0xCA, 0x01, 0x00, 0x00]))
-        return result.data if result else None
+        """
+            Gets the ATS of the connected tag
+            It is constant while the tag remains connected, so it is only retrieved once per tag
+        """
+        with self.__session():
+            if self.__ats is None:
+                result     = ACR122u.parse_response(self.execute(_CMD_GET_ATS))
+                self.__ats = result.data if result else None
+
+            return self.__ats
 
 
     # ##########################################################################
     # Commands: Authentication
     # ##########################################################################
-    def __load_auth_key(self, key:list[int], /, key_number:int=0x00):
+    def load_auth_key(self, key:bytes, /, key_number:int=0x00):
         """
             Loads authentication key into the reader volatile memory
-            The key is a byte list (integeres) with length 6
+            The key is a bytes object (or byte list of integers) with length 6
+                - bytes(key) validates type and range of every byte (raising TypeError/ValueError)
             Possible key numbers are 0 or 1. There are two volatile memory addresses in this reader
+            The loaded key is remembered per memory address, so that auth() can skip reloading it
+        """
+        key     = bytes(key)
+        command = ACR122u.__cmd_load_auth_key(key, key_number)
+
+        # If the command fails midway, the reader may or may not hold the new key: the slot is unknown
+        with self.__session():
+            self.__auth_keys[key_number] = None
+            result = ACR122u.parse_response(self.execute(command), raw=True)
+            self.__auth_keys[key_number] = key if result else None
+
+        return result
+
+
+    @staticmethod
+    def __cmd_load_auth_key(key:bytes, key_number:int):
         """
-        assert isinstance(key, list)
-        assert len(key) == 6
-        assert all(map(lambda x: isinstance(x, int), key))
-        assert key_number == 0 or key_number == 1
+            Builds the Load Authentication Keys command (see load_auth_key)
+        """
+        ACR122u.__check_auth_key(key, key_number)
+
+        return [*_CMD_LOAD_AUTH_KEY, key_number, 0x06, *key]
+
 
-        return ACR122u.parse_response(self.execute([0xFF, 0x82, 0x00, key_number, 0x06] + key))
+    @staticmethod
+    def __check_auth_key(key:bytes, key_number:int):
+        """
+            Raises ValueError if the key does not have 6 bytes or the memory slot is not 0 or 1
+        """
+        if len(key) != 6:
+            raise ValueError(f'authentication key must have 6 bytes, not {len(key)}')
+        if key_number not in (0, 1):
+            raise ValueError(f'key number must be 0 or 1, not {key_number}')
 
 
     def __commit_auth(self, block:int, key_type:int, /, key_number:int=0x00):
@@ -198,25 +621,63 @@ class ACR122u:
             Authenticates (card) with the key loaded into memory
                 - Memory slot is given by the key_number
                 - block is the memory sector we which to unlock in the card
-                - key_type: TYPE_A = 0, TYPE_B = 1
+                - key_type: TYPE_A = 0, TYPE_B = 1 (encoded as the 0x60/0x61 key type byte)
+        """
+        return ACR122u.parse_response(self.execute(ACR122u.__cmd_authenticate(block, key_type, key_number)), raw=True)
+
+
+    @staticmethod
+    def __cmd_authenticate(block:int, key_type:int, key_number:int):
+        """
+            Builds the General Authenticate command (see __commit_auth)
+        """
+        ACR122u.__check_auth_block(block, key_type)
+        if key_number not in (0, 1):
+            raise ValueError(f'key number must be 0 or 1, not {key_number}')
+
+        return [*_CMD_AUTHENTICATE, block, 0x60 | (key_type & 1), key_number]
+
+
+    @staticmethod
+    def __check_auth_block(block:int, key_type:int):
+        """
+            Raises ValueError if the block does not fit in one byte or the key type is not 0 or 1
         """
-        return ACR122u.parse_response(self.execute([0xFF, 0x86, 0x00 , 0x00           , 0x05] + \
-                                                   [0x01, 0x00, block, 0x60 + key_type, key_number]))
+        if not 0 <= block <= 0xFF:
+            raise ValueError(f'block must be between 0 and 255, not {block}')
+        if key_type not in (0, 1):
+            raise ValueError(f'key type must be 0 (TYPE_A) or 1 (TYPE_B), not {key_type}')
 
 
-    def auth(self, key:list[int], /, block:int, key_type:int):
+    def auth(self, key:bytes, /, block:int, key_type:int, key_number:int=None):
         """
             Function joins loading the authentication key into volatile memory
             And commits this key in order to unblock a specific memory sector
-                param key : list of integers with size 6
-                block     : any block id of the target sector
-                key_type  : 0 if TYPE_A, 1 if TYPE_B
+                param key  : bytes (or list of integers) with size 6
+                block      : any block id of the target sector
+                key_type   : 0 if TYPE_A, 1 if TYPE_B
+                key_number : reader memory slot (0 or 1) for the key. Defaults to one slot per key type,
+                             so that alternating key types does not reload keys
+            The key is only loaded if it differs from the one already in the reader memory
+            The authentication is only sent if the key was loaded, within the same session (see execute_many)
+            The response is raw (see parse_response), since authentication carries no data
         """
-        result = self.__load_auth_key(key, key_number=key_type)
-        if result:
-            result = self.__commit_auth(block, key_type, key_number=key_type)
+        # Every argument is validated before anything is transmitted (the key type before deriving the slot)
+        ACR122u.__check_auth_block(block, key_type)
+        if key_number is None:
+            key_number = key_type
 
-        return result
+        key = bytes(key)
+        ACR122u.__check_auth_key(key, key_number)
+        with self.__session():
+            if self.__auth_keys[key_number] != key:
+                loaded = self.load_auth_key(key, key_number)
+
+                # Otherwise, the card would be authenticated with whatever key is left in that slot
+                if not loaded:
+                    return loaded
+
+            return self.__commit_auth(block, key_type, key_number=key_number)
 
 
     # ##########################################################################
@@ -230,7 +691,62 @@ class ACR122u:
             0 to 16.
         """
         assert 0 <= length <= 16, f'maximum length to read from block is 16'
-        return ACR122u.parse_response(self.execute([0xFF, 0xB0, 0x00, block, length]))
+        return ACR122u.parse_response(self.execute([*_CMD_BLOCK_READ, block, length]))
+
+
+    def read_blocks(self, blocks:Iterable, length:int = 16):
+        """
+            Reads binary data from several blocks of a tag/card (see block_read)
+            All commands are transmitted in a single batch
+            Returns the list of responses, in the same order as the blocks
+        """
+        assert 0 <= length <= 16, f'maximum length to read from block is 16'
+        return [ACR122u.parse_response(r) for r in self.execute_many([[*_CMD_BLOCK_READ, b, length] for b in blocks])]
+
+
+    def block_read_many(self, blocks:Iterable, key:bytes, /, key_type:int, length:int = 16):
+        """
+            Reads binary data from several blocks of a MIFARE Classic tag/card
+            Blocks are grouped by sector, so that each sector is only authenticated once
+                param key : bytes (or list of integers) with size 6
+                key_type  : 0 if TYPE_A, 1 if TYPE_B
+            Returns a dict block -> response. If the authentication of a sector fails, its blocks
+            are mapped to the response of the failed authentication (in the same format as reads)
+            Each sector is authenticated and read within a single session, so that no other thread
+            can authenticate another sector in between
+        """
+        responses = dict()
+        for _, sector_blocks in groupby(sorted(set(blocks)), key=ACR122u._sector):
+            sector_blocks = list(sector_blocks)
+
+            with self.__session():
+                result = self.auth(key, block=sector_blocks[0], key_type=key_type)
+                if result:
+                    responses.update(zip(sector_blocks, self.read_blocks(sector_blocks, length)))
+                    continue
+
+            result = ACR122u.parse_response(result[:3])
+            responses.update((block, result) for block in sector_blocks)
+
+        return responses
+
+
+    # ##########################################################################
+    # Commands: Asynchronous
+    # ##########################################################################
+    async def execute_async(self, command, /, timeout = 20):
+        """
+            Transmits a command to the connected tag without blocking the event loop (see execute)
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, self.execute, command, timeout)
+
+
+    async def read_blocks_async(self, blocks:Iterable, length:int = 16):
+        """
+            Reads binary data from several blocks without blocking the event loop (see read_blocks)
+            Blocks are still transmitted as a single batch, instead of one task per block
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, self.read_blocks, list(blocks), length)
 
 
     # ##########################################################################
@@ -243,56 +759,60 @@ class ACR122u:
             If firmware was not available, it will be retrived.
             Due to restrictions of pyscard or the device itself, we need to have a
             tag connected, in order to obtain the device firmware
+            The firmware string (ASCII) spans the whole response, including sw1 and sw2
         """
         if self.__firmware is None:
-            result = ACR122u.parse_response(self.execute([0xFF, 0x00, 0x48, 0x00, 0x00]))
-            self.__firmware = ''.join(chr(int(x, base=16)) for x in (result.data.split(' ') + [result.sw1, result.sw2]))
+            result = ACR122u.parse_response(self.execute(_CMD_FIRMWARE), raw=True)
+            self.__firmware = (result.data + bytes((result.sw1, result.sw2))).decode('latin-1')
 
         return self.__firmware
 
 
-    def _block_max(self):
+    @staticmethod
+    def _sector(block:int):
         """
-            Returns the block size depending on card type
+            Returns the MIFARE Classic sector of a block
+            The first 32 sectors have 4 blocks each, the remaining (4K only) have 16 blocks each
         """
-        return self.__connection.type[1] if self.__connection else 0xFFFFFFFF
+        return block >> 2 if block < 0x80 else 0x20 + ((block - 0x80) >> 4)
 
 
-    # ##########################################################################
-    # Helper classes                                                           #
-    # ##########################################################################
-    class __ReaderObserver(ReaderObserver):
+    def _block_max(self):
         """
-            Observers readers and notifies
+            Returns the block size depending on card type
+            Computed once per inserted card (0xFFFFFFFF if unknown)
         """
-        def __init__(self, monitor):
-            """
-                We need to create a weak reference to the monitor
-            """
-            self.__monitor = weakref.ref(monitor)
+        return self.__block_max
 
 
-        def update(self, observable, handlers):
-            """
-                Overload to smartcard.ReaderMonitoring.ReaderObserver
-                update method
-            """
-            self.__monitor().update(rnew=handlers[0], rold=handlers[1])
+    def _sector_max(self):
+        """
+            Returns the number of sectors depending on card type
+            Computed once per inserted card (0xFFFFFFFF if unknown)
+        """
+        return self.__sector_max
 
 
+    # ##########################################################################
+    # Helper classes                                                           #
+    # ##########################################################################
     class __CardObserver(CardObserver):
         """
             Observeres readers and notifies
         """
-        def __init__(self, monitor):
+        __slots__ = ('__put',)
+
+        def __init__(self, events):
             """
-                We need to create a weak reference to the monitor
+                Events are queued, instead of referencing the monitor
+                The queue put method is bound once, so each notification is a single call
             """
-            self.__monitor = weakref.ref(monitor)
+            self.__put = events.put
 
 
         def update(self, observable, actions):
             """
-                TODO:
+                Overload to smartcard.CardMonitoring.CardObserver
+                update method
             """
-            self.__monitor().update_card(cnew=actions[0], cold=actions[1])
+            self.__put(('card', actions[0], actions[1]))